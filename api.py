@@ -0,0 +1,89 @@
+import base64
+import json
+from datetime import datetime
+
+from flask import current_app
+
+try:
+    import orjson
+except ImportError:  # Listed in requirements.txt; fall back to the stdlib encoder if missing
+    orjson = None
+
+# Columns a client may request with ?fields=, and the default selection.
+# content is the bulk of each row, so it is only loaded when asked for.
+POST_FIELDS = ('id', 'title', 'excerpt', 'content', 'featured_image', 'author_id',
+               'allow_comments', 'created_at', 'updated_at', 'published_at')
+DEFAULT_POST_FIELDS = tuple(f for f in POST_FIELDS if f != 'content')
+
+
+class ApiError(Exception):
+    """Raised for bad API input; rendered as a JSON 400 response"""
+
+
+def parse_fields(value):
+    """Parse ?fields=a,b into a tuple of known post fields"""
+    fields = tuple(dict.fromkeys(f.strip() for f in (value or '').split(',') if f.strip()))
+    if not fields:
+        return DEFAULT_POST_FIELDS
+    unknown = [f for f in fields if f not in POST_FIELDS]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def parse_ids(value, limit):
+    """Parse ?ids=1,2,3 into a list of unique integers"""
+    try:
+        ids = list(dict.fromkeys(int(i) for i in value.split(',') if i.strip()))
+    except ValueError:
+        raise ApiError('ids must be a comma-separated list of integers')
+    if len(ids) > limit:
+        raise ApiError(f'At most {limit} ids can be requested at once')
+    return ids
+
+
+def encode_cursor(published_at, post_id):
+    """Opaque cursor pointing just after the given post"""
+    raw = f'{published_at.isoformat()}|{post_id}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Return (published_at, id) from a cursor made by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        published_at, post_id = raw.split('|')
+        return datetime.fromisoformat(published_at), int(post_id)
+    except (ValueError, UnicodeError):
+        raise ApiError('Invalid cursor')
+
+
+def serialize_row(row, fields):
+    """Turn a result row into a dict holding only the requested fields"""
+    item = {}
+    for field in fields:
+        value = getattr(row, field)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        item[field] = value
+    return item
+
+
+def dumps(data):
+    """Serialize to JSON bytes, using orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def json_response(data, status=200, cache=True):
+    """Build a JSON response with cache headers.
+
+    ETags and 304s are handled by the compression after_request hook,
+    which sees the final (possibly compressed) body.
+    """
+    response = current_app.response_class(dumps(data), status=status, mimetype='application/json')
+    if cache:
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config['API_CACHE_MAX_AGE']
+    return response
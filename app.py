@@ -2,8 +2,13 @@ from flask import Flask, render_template, request, redirect, url_for, flash, sen
 from flask_login import login_user, logout_user, login_required, current_user
 from config import Config
 from extension import db, migrate, login_manager
-from werkzeug.utils import secure_filename
-import os
+from decorators import rate_limited
+from werkzeug.exceptions import TooManyRequests
+import api
+import compression
+import storage
+import throttle
+import click
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
@@ -12,13 +17,7 @@ def allowed_file(filename):
 def save_upload_file(file):
     """Save uploaded file and return the relative path"""
     if file and file.filename and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        # Add timestamp to filename to make it unique
-        import time
-        filename = f"{int(time.time())}_{filename}"
-        filepath = os.path.join(Config.UPLOAD_FOLDER, filename)
-        file.save(filepath)
-        return f"uploads/{filename}"
+        return storage.save_file(file)
     return None
 
 def create_app(config_class=Config):
@@ -29,6 +28,8 @@ def create_app(config_class=Config):
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
+    throttle.init_app(app)
+    compression.init_app(app)
     
     # Import models (must be after extension initialization)
     from models import User, Admin, BlogPost, Comment
@@ -74,6 +75,7 @@ def create_app(config_class=Config):
     
     # Login route
     @app.route('/login', methods=['GET', 'POST'])
+    @rate_limited('login')
     def login():
         if current_user.is_authenticated:
             # Check if user is admin or regular user
@@ -84,6 +86,11 @@ def create_app(config_class=Config):
         
         form = LoginForm()
         if form.validate_on_submit():
+            # Refuse before hashing the password if this email has too many failures
+            retry_after = throttle.check_failures('login', form.email.data)
+            if retry_after:
+                raise TooManyRequests(retry_after=retry_after)
+            
             # Try to authenticate as regular user first
             user = User.query.filter_by(email=form.email.data).first()
             
@@ -101,12 +108,14 @@ def create_app(config_class=Config):
                 return redirect(url_for('admin_dashboard'))
             
             # Invalid credentials
+            throttle.record_failure('login', form.email.data)
             flash('Invalid email or password.', 'error')
         
         return render_template('login.html', form=form)
     
     # Signup route
     @app.route('/signup', methods=['GET', 'POST'])
+    @rate_limited('signup')
     def signup():
         if current_user.is_authenticated:
             return redirect(url_for('user_dashboard'))
@@ -180,6 +189,8 @@ def create_app(config_class=Config):
                 blog.publish()
             
             db.session.add(blog)
+            if featured_image:
+                storage.attach(featured_image, blog)
             db.session.commit()
             
             flash('Blog post created successfully!', 'success')
@@ -226,7 +237,10 @@ def create_app(config_class=Config):
             if form.featured_image.data:
                 featured_image_path = save_upload_file(form.featured_image.data)
                 if featured_image_path:
+                    if blog.featured_image:
+                        storage.release(blog.featured_image)
                     blog.featured_image = featured_image_path
+                    storage.attach(featured_image_path, blog)
             
             # Handle publish status
             if form.is_published.data and not blog.is_published:
@@ -263,14 +277,9 @@ def create_app(config_class=Config):
             flash('You can only delete your own blog posts.', 'error')
             return redirect(url_for('admin_blog_list'))
         
-        # Delete featured image if it exists
+        # Featured image is removed by the upload sweeper after its grace period
         if blog.featured_image:
-            try:
-                filepath = os.path.join(app.root_path, blog.featured_image)
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-            except Exception as e:
-                app.logger.error(f'Error deleting file: {e}')
+            storage.release(blog.featured_image)
         
         db.session.delete(blog)
         db.session.commit()
@@ -304,13 +313,14 @@ def create_app(config_class=Config):
         return redirect(url_for('index'))
     
     # Serve uploaded files
-    @app.route('/uploads/<filename>')
+    @app.route('/uploads/<path:filename>')
     def uploaded_file(filename):
         """Serve uploaded files from the uploads folder"""
-        return send_from_directory(Config.UPLOAD_FOLDER, filename)
+        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
     
     # Comment routes
     @app.route('/blog/<int:blog_id>/comment', methods=['POST'])
+    @rate_limited('post_comment')
     def post_comment(blog_id):
         """Post a comment on a blog post"""
         post = BlogPost.query.get_or_404(blog_id)
@@ -346,6 +356,7 @@ def create_app(config_class=Config):
         return redirect(url_for('blog_detail', blog_id=blog_id))
     
     @app.route('/blog/<int:blog_id>/comment/<int:comment_id>/reply', methods=['POST'])
+    @rate_limited('reply_comment')
     def reply_comment(blog_id, comment_id):
         """Reply to a comment on a blog post"""
         post = BlogPost.query.get_or_404(blog_id)
@@ -432,6 +443,77 @@ def create_app(config_class=Config):
         flash('Comment deleted successfully!', 'success')
         return redirect(url_for('blog_detail', blog_id=blog_id))
     
+    # JSON API: read published posts
+    @app.route('/api/posts')
+    def api_posts():
+        """List published posts with cursor pagination, or batch fetch by ?ids="""
+        try:
+            fields = api.parse_fields(request.args.get('fields'))
+            max_items = app.config['API_MAX_PAGE_SIZE']
+            
+            # Only load the requested columns (plus what ordering needs)
+            columns = dict.fromkeys(fields + ('id', 'published_at'))
+            query = db.session.query(*[getattr(BlogPost, c) for c in columns]).filter_by(is_published=True)
+            
+            ids = request.args.get('ids')
+            if ids is not None:
+                ids = api.parse_ids(ids, max_items)
+                rows = {row.id: row for row in query.filter(BlogPost.id.in_(ids))} if ids else {}
+                posts = [api.serialize_row(rows[i], fields) for i in ids if i in rows]
+                return api.json_response({'posts': posts})
+            
+            limit = min(max(request.args.get('limit', 20, type=int), 1), max_items)
+            cursor = request.args.get('cursor')
+            if cursor:
+                published_at, post_id = api.decode_cursor(cursor)
+                query = query.filter(db.or_(
+                    BlogPost.published_at < published_at,
+                    db.and_(BlogPost.published_at == published_at, BlogPost.id < post_id)
+                ))
+            rows = query.order_by(BlogPost.published_at.desc(), BlogPost.id.desc()).limit(limit + 1).all()
+        except api.ApiError as e:
+            return api.json_response({'error': str(e)}, status=400, cache=False)
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = api.encode_cursor(rows[-1].published_at, rows[-1].id)
+        posts = [api.serialize_row(row, fields) for row in rows]
+        return api.json_response({'posts': posts, 'next_cursor': next_cursor})
+    
+    # CLI: index files already on disk
+    @app.cli.command('index-uploads')
+    def index_uploads():
+        """Add existing upload files to the storage index"""
+        added = storage.index_existing_files()
+        click.echo(f'Indexed {added} files.')
+    
+    # CLI: remove unreferenced uploads
+    @app.cli.command('sweep-uploads')
+    @click.option('--grace', type=int, default=None, help='Grace period in seconds.')
+    @click.option('--batch-size', type=int, default=None, help='Max files removed per batch.')
+    @click.option('--all', 'sweep_all', is_flag=True, help='Keep sweeping until nothing is left.')
+    def sweep_uploads(grace, batch_size, sweep_all):
+        """Delete uploads no blog post references after the grace period"""
+        files = reclaimed = 0
+        while True:
+            result = storage.sweep_orphans(grace_period=grace, batch_size=batch_size)
+            files += result['files']
+            reclaimed += result['bytes']
+            if not sweep_all or not result['files']:
+                break
+        click.echo(f'Removed {files} files, reclaimed {reclaimed} bytes.')
+    
+    # CLI: precompress static files
+    @app.cli.command('compress-static')
+    def compress_static():
+        """Write .gz/.br siblings for static files"""
+        written = compression.compress_static(app)
+        click.echo(f'Wrote {written} compressed files.')
+    
+    # Background sweeper (disabled unless UPLOAD_SWEEP_INTERVAL is set; starts on first request)
+    storage.start_sweeper(app)
+    
     return app
 
 if __name__ == '__main__':
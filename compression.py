@@ -0,0 +1,115 @@
+import gzip
+import mimetypes
+import os
+
+from flask import request, send_from_directory
+from werkzeug.http import generate_etag
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # Listed in requirements.txt; fall back to gzip only if missing
+    brotli = None
+
+# Suffix of the precompressed sibling written for each encoding
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def _accepted_encodings(available):
+    """Encodings the client accepts, in our order of preference"""
+    return [enc for enc in ('br', 'gzip') if enc in available and request.accept_encodings[enc]]
+
+
+def _is_compressible(config, mimetype):
+    return mimetype in config['COMPRESS_MIMETYPES']
+
+
+def _is_compressible_file(config, filename):
+    """Whether a static file should get precompressed siblings"""
+    if filename.endswith(tuple(SUFFIXES.values())):
+        return False
+    return _is_compressible(config, mimetypes.guess_type(filename)[0])
+
+
+def compress(data, encoding, config):
+    """Compress bytes with the given encoding at the configured level"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESS_BR_LEVEL'])
+    return gzip.compress(data, compresslevel=config['COMPRESS_LEVEL'], mtime=0)
+
+
+def init_app(app):
+    """Compress dynamic responses and serve precompressed static files"""
+    config = app.config
+    if not config['COMPRESS_ENABLED']:
+        return
+
+    dynamic_encodings = ('br', 'gzip') if brotli else ('gzip',)
+
+    @app.after_request
+    def compress_response(response):
+        if (request.method not in ('GET', 'HEAD')
+                or response.status_code != 200
+                or response.direct_passthrough
+                or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or not _is_compressible(config, response.mimetype)):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encodings = _accepted_encodings(dynamic_encodings)
+        data = response.get_data()
+        etag = generate_etag(data)
+        if encodings and len(data) >= config['COMPRESS_MIN_SIZE']:
+            encoding = encodings[0]
+            response.set_data(compress(data, encoding, config))
+            response.headers['Content-Encoding'] = encoding
+            # Each encoding gets its own ETag so caches never mix variants
+            etag = f'{etag}-{encoding}'
+        response.set_etag(etag)
+        return response.make_conditional(request)
+
+    def send_static(filename):
+        """Serve a .br/.gz sibling built by `flask compress-static` when possible"""
+        if _is_compressible_file(config, filename):
+            source = safe_join(app.static_folder, filename)
+            for encoding in _accepted_encodings(SUFFIXES):
+                sibling = filename + SUFFIXES[encoding]
+                path = safe_join(app.static_folder, sibling)
+                if (source and path and os.path.isfile(source) and os.path.isfile(path)
+                        and os.path.getmtime(path) >= os.path.getmtime(source)):
+                    response = send_from_directory(
+                        app.static_folder, sibling, mimetype=mimetypes.guess_type(filename)[0],
+                        max_age=app.get_send_file_max_age(filename)
+                    )
+                    response.headers['Content-Encoding'] = encoding
+                    response.vary.add('Accept-Encoding')
+                    return response
+            response = app.send_static_file(filename)
+            response.vary.add('Accept-Encoding')
+            return response
+        return app.send_static_file(filename)
+
+    app.view_functions['static'] = send_static
+
+
+def compress_static(app):
+    """Write .gz (and .br if available) siblings for compressible static files"""
+    config = app.config
+    encodings = ('br', 'gzip') if brotli else ('gzip',)
+    written = 0
+    for root, _dirs, files in os.walk(app.static_folder):
+        for name in files:
+            if not _is_compressible_file(config, name):
+                continue
+            source = os.path.join(root, name)
+            with open(source, 'rb') as f:
+                data = f.read()
+            for encoding in encodings:
+                target = source + SUFFIXES[encoding]
+                if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+                    continue
+                with open(target, 'wb') as f:
+                    f.write(compress(data, encoding, config))
+                written += 1
+    return written
@@ -14,7 +14,41 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'doc', 'docx'}
-    
+
+    # Upload sweeper configuration
+    UPLOAD_ORPHAN_GRACE_PERIOD = 24 * 60 * 60  # Keep unreferenced files for a day
+    UPLOAD_SWEEP_BATCH_SIZE = 100  # Max files removed per sweep
+    UPLOAD_SWEEP_RATE = 20  # Max files removed per second
+    UPLOAD_SWEEP_INTERVAL = int(os.environ.get('UPLOAD_SWEEP_INTERVAL') or 0)  # Seconds; 0 disables the background sweeper
+    UPLOAD_SWEEP_LOCK_FILE = os.path.join(os.path.dirname(__file__), 'instance', 'upload-sweeper.lock')  # One sweeper per host
+
+    # Throttling configuration
+    THROTTLE_ENABLED = True
+    THROTTLE_BACKEND = os.environ.get('THROTTLE_BACKEND') or 'memory'  # 'sqlite' shares limits across workers
+    THROTTLE_STORAGE_PATH = os.path.join(os.path.dirname(__file__), 'instance', 'throttle.db')
+    THROTTLE_MAX_KEYS = 10000  # Least recently used keys are evicted beyond this
+    # Per endpoint: 'ip' is a token bucket (requests, seconds) per client IP,
+    # 'account' is a sliding window (requests, seconds) per logged-in user,
+    # 'failures' is a sliding window (failed attempts, seconds) per account name, counted by the view
+    THROTTLE_LIMITS = {
+        'login': {'ip': (10, 60), 'failures': (5, 300)},
+        'signup': {'ip': (3, 300)},
+        'post_comment': {'ip': (5, 60), 'account': (20, 3600)},
+        'reply_comment': {'ip': (5, 60), 'account': (20, 3600)},
+    }
+
+    # Compression configuration
+    COMPRESS_ENABLED = True
+    COMPRESS_MIN_SIZE = 500  # Bytes; smaller responses are sent as-is
+    COMPRESS_LEVEL = 6  # gzip level (1-9)
+    COMPRESS_BR_LEVEL = 5  # brotli quality (0-11), used when the brotli package is installed
+    COMPRESS_MIMETYPES = {'text/html', 'text/css', 'text/plain', 'text/javascript',
+                          'application/javascript', 'application/json', 'image/svg+xml'}
+
+    # JSON API configuration
+    API_MAX_PAGE_SIZE = 100  # Max posts per page or ids per batch request
+    API_CACHE_MAX_AGE = 60  # Seconds clients and proxies may cache API responses
+
     # Ensure upload folder exists
     @classmethod
     def init_app(cls, app):
@@ -31,6 +65,7 @@ class TestingConfig(Config):
     DEBUG = True
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    THROTTLE_ENABLED = False
 
 class ProductionConfig(Config):
     """Production configuration"""
@@ -0,0 +1,20 @@
+from functools import wraps
+from werkzeug.exceptions import TooManyRequests
+import throttle
+
+
+def rate_limited(endpoint):
+    """Reject the request with 429 once it exceeds the THROTTLE_LIMITS for endpoint.
+
+    Runs before the view body, so rejected requests never reach form
+    parsing or the database.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            retry_after = throttle.check(endpoint)
+            if retry_after:
+                raise TooManyRequests(retry_after=retry_after)
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
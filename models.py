@@ -129,3 +129,19 @@ class Comment(db.Model):
 
     def __repr__(self):
         return f'<Comment by {self.author_name}>'
+
+
+class StoredFile(db.Model):
+    """Index of uploaded files and the blog post referencing them"""
+    id = db.Column(db.Integer, primary_key=True)
+    path = db.Column(db.String(255), unique=True, nullable=False, index=True)  # e.g. uploads/a1/9f/name.png
+    size = db.Column(db.Integer, nullable=False, default=0)  # Bytes on disk
+    blog_post_id = db.Column(db.Integer, db.ForeignKey('blog_post.id'), nullable=True, index=True)  # NULL if unreferenced
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    orphaned_at = db.Column(db.DateTime, nullable=True, index=True)  # When the file lost its last reference
+    
+    # Relationships
+    blog_post = db.relationship('BlogPost', backref='stored_files')
+
+    def __repr__(self):
+        return f'<StoredFile {self.path}>'
@@ -0,0 +1,248 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from werkzeug.security import safe_join
+from werkzeug.utils import secure_filename
+
+from extension import db
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Uploads are stored as uploads/<aa>/<bb>/<filename> where aa/bb come from a
+# hash of the filename, so no single directory grows without bound.
+UPLOAD_URL_PREFIX = 'uploads/'
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+
+
+def shard_dir(filename):
+    """Return the relative shard directory for a filename, e.g. 'a1/9f'"""
+    digest = hashlib.sha1(filename.encode('utf-8')).hexdigest()
+    parts = [digest[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH] for i in range(SHARD_LEVELS)]
+    return '/'.join(parts)
+
+
+def disk_path(stored_path):
+    """Resolve a stored path like 'uploads/a1/9f/x.png' to a file on disk"""
+    if not stored_path or not stored_path.startswith(UPLOAD_URL_PREFIX):
+        return None
+    return safe_join(current_app.config['UPLOAD_FOLDER'], stored_path[len(UPLOAD_URL_PREFIX):])
+
+
+def _prune_empty_dirs(directory):
+    """Remove empty shard directories from directory up to (not including) UPLOAD_FOLDER"""
+    upload_folder = os.path.abspath(current_app.config['UPLOAD_FOLDER'])
+    directory = os.path.abspath(directory)
+    while directory != upload_folder and directory.startswith(upload_folder + os.sep):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            break  # Not empty (or already gone)
+        directory = os.path.dirname(directory)
+
+
+def save_file(file):
+    """Save an uploaded file into its shard, index it and return the stored path"""
+    filename = secure_filename(file.filename)
+    # Add timestamp and a random part so one path always means one file
+    filename = f"{int(time.time())}_{uuid.uuid4().hex}_{filename}"
+    relative = f"{shard_dir(filename)}/{filename}"
+    filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], relative)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    file.save(filepath)
+
+    stored_path = f"{UPLOAD_URL_PREFIX}{relative}"
+    register_file(stored_path, os.path.getsize(filepath))
+    return stored_path
+
+
+def register_file(stored_path, size, blog_post_id=None):
+    """Add a file to the index; unreferenced files start their grace period now"""
+    from models import StoredFile
+
+    stored = StoredFile.query.filter_by(path=stored_path).first()
+    if stored is None:
+        stored = StoredFile(path=stored_path, size=size)
+        db.session.add(stored)
+    stored.blog_post_id = blog_post_id
+    stored.orphaned_at = None if blog_post_id else datetime.utcnow()
+    return stored
+
+
+def attach(stored_path, blog_post):
+    """Mark a stored file as referenced by a blog post"""
+    from models import StoredFile
+
+    stored = StoredFile.query.filter_by(path=stored_path).first()
+    if stored is not None:
+        stored.blog_post = blog_post
+        stored.orphaned_at = None
+    return stored
+
+
+def release(stored_path):
+    """Mark a stored file as unreferenced so the sweeper can reclaim it later"""
+    from models import StoredFile
+
+    stored = StoredFile.query.filter_by(path=stored_path).first()
+    if stored is not None:
+        stored.blog_post_id = None
+        stored.orphaned_at = datetime.utcnow()
+    return stored
+
+
+def index_existing_files():
+    """Index files already on disk (e.g. legacy flat uploads); returns count added"""
+    from models import StoredFile, BlogPost
+
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    known = {path for (path,) in db.session.query(StoredFile.path)}
+    referenced = dict(
+        db.session.query(BlogPost.featured_image, BlogPost.id)
+        .filter(BlogPost.featured_image.isnot(None))
+    )
+
+    added = 0
+    for root, _dirs, files in os.walk(upload_folder):
+        for name in files:
+            filepath = os.path.join(root, name)
+            relative = os.path.relpath(filepath, upload_folder).replace(os.sep, '/')
+            stored_path = f"{UPLOAD_URL_PREFIX}{relative}"
+            if stored_path in known:
+                continue
+            register_file(stored_path, os.path.getsize(filepath), referenced.get(stored_path))
+            added += 1
+    db.session.commit()
+    return added
+
+
+def sweep_orphans(grace_period=None, batch_size=None, rate=None):
+    """Delete unreferenced files older than the grace period.
+
+    Works through at most ``batch_size`` files per call and deletes no more
+    than ``rate`` files per second. Returns a dict with the number of files
+    removed and bytes reclaimed.
+    """
+    from models import StoredFile, BlogPost
+
+    config = current_app.config
+    if grace_period is None:
+        grace_period = config['UPLOAD_ORPHAN_GRACE_PERIOD']
+    if batch_size is None:
+        batch_size = config['UPLOAD_SWEEP_BATCH_SIZE']
+    if rate is None:
+        rate = config['UPLOAD_SWEEP_RATE']
+
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_period)
+    candidates = (db.session.query(StoredFile.id, StoredFile.path, StoredFile.size)
+                  .filter(StoredFile.orphaned_at.isnot(None), StoredFile.orphaned_at <= cutoff)
+                  .order_by(StoredFile.orphaned_at)
+                  .limit(batch_size)
+                  .all())
+
+    # A post may have picked a file up again since it was released
+    owners = dict(
+        db.session.query(BlogPost.featured_image, BlogPost.id)
+        .filter(BlogPost.featured_image.in_([c.path for c in candidates]))
+    ) if candidates else {}
+    for stored_id, path, _size in candidates:
+        if path in owners:
+            StoredFile.query.filter_by(id=stored_id).update(
+                {'blog_post_id': owners[path], 'orphaned_at': None}
+            )
+    db.session.commit()
+
+    result = {'files': 0, 'bytes': 0}
+    for stored_id, path, size in candidates:
+        if path in owners:
+            continue
+
+        filepath = disk_path(path)
+        try:
+            if filepath and os.path.exists(filepath):
+                os.remove(filepath)
+                result['bytes'] += size or 0
+                _prune_empty_dirs(os.path.dirname(filepath))
+        except OSError as e:
+            current_app.logger.error(f'Error deleting file {path}: {e}')
+            continue
+
+        # Commit each delete so no write lock is held while sleeping
+        StoredFile.query.filter_by(id=stored_id).delete()
+        db.session.commit()
+        result['files'] += 1
+        if rate:
+            time.sleep(1.0 / rate)
+
+    return result
+
+
+def _acquire_host_lock(path):
+    """Take a non-blocking exclusive lock on path; returns the open file or None"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    lock_file = open(path, 'a')
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def start_sweeper(app):
+    """Run sweep_orphans periodically on a daemon thread, off the request path.
+
+    The thread starts on the first request this process serves, so CLI
+    commands and the reloader's parent process never run it, and only the
+    process holding UPLOAD_SWEEP_LOCK_FILE sweeps on each host.
+    """
+    interval = app.config.get('UPLOAD_SWEEP_INTERVAL')
+    if not interval:
+        return
+
+    def run(lock_file):
+        # lock_file stays referenced here so the host lock lives as long as the thread
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    result = sweep_orphans()
+                    if result['files']:
+                        app.logger.info(
+                            f"Upload sweeper removed {result['files']} files, "
+                            f"reclaimed {result['bytes']} bytes"
+                        )
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.error(f'Upload sweeper failed: {e}')
+                finally:
+                    db.session.remove()
+
+    state = {'checked': False}
+    state_lock = threading.Lock()
+
+    @app.before_request
+    def start_sweeper_thread():
+        if state['checked']:
+            return
+        with state_lock:
+            if state['checked']:
+                return
+            state['checked'] = True
+            lock_file = _acquire_host_lock(app.config['UPLOAD_SWEEP_LOCK_FILE'])
+            if lock_file is None:
+                return
+            thread = threading.Thread(target=run, args=(lock_file,), name='upload-sweeper', daemon=True)
+            thread.start()
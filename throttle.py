@@ -0,0 +1,211 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request, session
+
+
+class MemoryBackend:
+    """Per-process throttle state with LRU eviction"""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._state = OrderedDict()  # key -> (a, b, c) tuple, see take() and hit()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        state = self._state.get(key)
+        if state is not None:
+            self._state.move_to_end(key)
+        return state
+
+    def _set(self, key, state):
+        self._state[key] = state
+        self._state.move_to_end(key)
+        while len(self._state) > self.max_keys:
+            self._state.popitem(last=False)
+
+    def take(self, key, capacity, per, now):
+        """Token bucket: return 0 if a token was taken, else seconds to wait"""
+        with self._lock:
+            state = _take(self._get(key), capacity, per, now)
+            self._set(key, state[:2])
+            return state[2]
+
+    def hit(self, key, limit, window, now, record=True):
+        """Sliding window counter: return 0 if allowed, else seconds to wait.
+        With record=False the request is checked but not counted."""
+        with self._lock:
+            state = _hit(self._get(key), limit, window, now, record)
+            self._set(key, state[:3])
+            return state[3]
+
+
+class SqliteBackend:
+    """Throttle state in a local SQLite file shared by all workers on the host"""
+
+    def __init__(self, path, max_keys=10000):
+        self.path = path
+        self.max_keys = max_keys
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS throttle ('
+            'key TEXT PRIMARY KEY, a REAL, b REAL, c REAL, touched REAL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_throttle_touched ON throttle (touched)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+        return conn
+
+    def _update(self, key, now, step):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT a, b, c FROM throttle WHERE key = ?', (key,)).fetchone()
+            state = step(row)
+            values = tuple(state[:-1])
+            values += (None,) * (3 - len(values))
+            conn.execute(
+                'INSERT OR REPLACE INTO throttle (key, a, b, c, touched) VALUES (?, ?, ?, ?, ?)',
+                (key,) + values + (now,)
+            )
+            # Evict least recently used keys once the table is over its limit
+            self._writes += 1
+            if self._writes % 100 == 0:
+                conn.execute(
+                    'DELETE FROM throttle WHERE key IN ('
+                    'SELECT key FROM throttle ORDER BY touched DESC LIMIT -1 OFFSET ?)',
+                    (self.max_keys,)
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return state[-1]
+
+    def take(self, key, capacity, per, now):
+        """Token bucket: return 0 if a token was taken, else seconds to wait"""
+        return self._update(key, now, lambda row: _take(row and row[:2], capacity, per, now))
+
+    def hit(self, key, limit, window, now, record=True):
+        """Sliding window counter: return 0 if allowed, else seconds to wait.
+        With record=False the request is checked but not counted."""
+        return self._update(key, now, lambda row: _hit(row, limit, window, now, record))
+
+
+def _take(state, capacity, per, now):
+    """Refill a (tokens, last) bucket and try to take one token"""
+    rate = capacity / per
+    if state is None:
+        tokens, last = capacity, now
+    else:
+        tokens, last = state
+        tokens = min(capacity, tokens + (now - last) * rate)
+    if tokens >= 1:
+        return tokens - 1, now, 0
+    return tokens, now, (1 - tokens) / rate
+
+
+def _hit(state, limit, window, now, record=True):
+    """Count a request in a (window_start, current, previous) sliding window"""
+    start = now - now % window
+    if state is None:
+        current, previous = 0, 0
+    else:
+        last_start, current, previous = state
+        if last_start != start:
+            previous = current if start - last_start == window else 0
+            current = 0
+    # Weight the previous window by how much of it still overlaps
+    elapsed = now - start
+    weight = 1 - elapsed / window
+    if previous * weight + current + 1 > limit:
+        return start, current, previous, _window_wait(limit, window, elapsed, current, previous)
+    return start, current + 1 if record else current, previous, 0
+
+
+def _window_wait(limit, window, elapsed, current, previous):
+    """Seconds until previous * weight + current + 1 <= limit holds again"""
+    allowance = limit - 1
+    # Still in this window, once enough of the previous window has slid out
+    if previous and current <= allowance:
+        wait = window * (1 - (allowance - current) / previous) - elapsed
+        if wait < window - elapsed:
+            return max(wait, 0)
+    # Otherwise in the next window, where this window's count becomes previous
+    wait = window - elapsed
+    if current > allowance:
+        wait += window * (1 - allowance / current)
+    return wait
+
+
+def init_app(app):
+    """Create the throttle backend configured for this app"""
+    max_keys = app.config['THROTTLE_MAX_KEYS']
+    if app.config['THROTTLE_BACKEND'] == 'sqlite':
+        backend = SqliteBackend(app.config['THROTTLE_STORAGE_PATH'], max_keys)
+    else:
+        backend = MemoryBackend(max_keys)
+    app.extensions['throttle'] = backend
+    return backend
+
+
+def check(endpoint):
+    """Return seconds to wait if the current request is over its limits, else 0"""
+    config = current_app.config
+    limits = config['THROTTLE_LIMITS'].get(endpoint)
+    if not config['THROTTLE_ENABLED'] or not limits or request.method != 'POST':
+        return 0
+
+    backend = current_app.extensions['throttle']
+    now = time.time()
+
+    if 'ip' in limits:
+        capacity, per = limits['ip']
+        wait = backend.take(f'{endpoint}:ip:{request.remote_addr}', capacity, per, now)
+        if wait:
+            return math.ceil(wait)
+
+    if 'account' in limits:
+        # The session cookie identifies the account without a database lookup
+        account = session.get('_user_id')
+        if account:
+            limit, window = limits['account']
+            wait = backend.hit(f'{endpoint}:account:{account}', limit, window, now)
+            if wait:
+                return math.ceil(wait)
+
+    return 0
+
+
+def _failures(endpoint, account, record):
+    config = current_app.config
+    limits = config['THROTTLE_LIMITS'].get(endpoint) or {}
+    if not config['THROTTLE_ENABLED'] or 'failures' not in limits or not account:
+        return 0
+    limit, window = limits['failures']
+    key = f'{endpoint}:failures:{account.strip().lower()}'
+    wait = current_app.extensions['throttle'].hit(key, limit, window, time.time(), record)
+    return math.ceil(wait)
+
+
+def check_failures(endpoint, account):
+    """Return seconds to wait if account has too many recent failures, else 0"""
+    return _failures(endpoint, account, record=False)
+
+
+def record_failure(endpoint, account):
+    """Count a failed attempt (e.g. a wrong password) against account"""
+    _failures(endpoint, account, record=True)